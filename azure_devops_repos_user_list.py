@@ -1,12 +1,24 @@
 import os
 import sys
+import time
 import json
 import csv
 import argparse
+import functools
 import requests
+import requests_cache
 import base64
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load .env
 load_dotenv()
 sys.stdout.reconfigure(encoding='utf-8')
@@ -18,6 +30,26 @@ if not PAT or not ORGANIZATION:
     print("Set AZURE_DEVOPS_PAT and AZURE_DEVOPS_ORG in your .env file.")
     exit(1)
 
+# Default number of concurrent API requests (override with --workers)
+MAX_WORKERS = 16
+
+# Pause once fewer requests than this remain in the current rate-limit window
+RATE_LIMIT_THRESHOLD = 10
+
+# Longest pause in seconds while waiting for a rate-limit window to reset
+RATE_LIMIT_MAX_WAIT = 60
+
+# Team member identities by team id, so a team is only fetched once per run
+TEAM_MEMBERS_CACHE = {}
+
+# Lifetime in seconds of cached API responses when running with --cache
+CACHE_EXPIRE_AFTER = 3600
+
+
+def identity_display_name(identity):
+    """Pick the most readable name of an Azure DevOps identity"""
+    return identity.get('displayName') or identity.get('uniqueName') or 'Unknown'
+
 
 def get_authentication_header():
     """Create authentication header for Azure DevOps API"""
@@ -29,10 +61,105 @@ def get_authentication_header():
     }
 
 
+def throttle_on_rate_limit(res, *args, quiet=False, **kwargs):
+    """Wait when the API reports a nearly exhausted rate limit, retrying a refused request once"""
+    if getattr(res, 'from_cache', False):
+        return None
+
+    delay = 0
+    remaining = res.headers.get('X-RateLimit-Remaining')
+    reset = res.headers.get('X-RateLimit-Reset')
+    if remaining and reset and float(remaining) < RATE_LIMIT_THRESHOLD:
+        # X-RateLimit-Reset is the epoch second at which the window resets
+        delay = float(reset) - time.time() + 1
+    elif res.headers.get('Retry-After', '').isdigit():
+        delay = int(res.headers['Retry-After'])
+
+    # 429 is left out of the adapter's Retry, so every rate-limit wait happens here
+    refused = res.status_code == 429 or (res.status_code == 403 and remaining == '0')
+    if refused and delay > RATE_LIMIT_MAX_WAIT:
+        # Too long to wait; the caller reports the refused request
+        return None
+    if refused:
+        # Pause at least a second even when the API does not say how long to wait
+        delay = max(delay, 1)
+
+    if delay > 0:
+        if not quiet:
+            print(f"Rate limit reached, waiting {int(min(delay, RATE_LIMIT_MAX_WAIT))} seconds...")
+        time.sleep(min(delay, RATE_LIMIT_MAX_WAIT))
+
+    if refused:
+        # Release the refused response's connection; a response returned from a hook
+        # replaces the original one
+        res.close()
+        return res.connection.send(res.request, **kwargs)
+    return None
+
+
+def create_session(cache=False, pool_size=MAX_WORKERS, quiet=False):
+    """Create the HTTP session shared by all API calls"""
+    if cache:
+        # Keep GET responses in a local SQLite file so re-runs skip unchanged requests
+        session = requests_cache.CachedSession(
+            'azure_devops_cache',
+            backend='sqlite',
+            expire_after=CACHE_EXPIRE_AFTER,
+            allowable_methods=['GET'],
+            cache_control=True
+        )
+    else:
+        session = requests.Session()
+
+    # Pooled keep-alive connections are reused across repeated API calls; the pool
+    # holds one connection per worker so concurrent requests never open extra ones
+    session.mount('https://', HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=1.0,
+            # Rate limits (429 and Retry-After) are left to throttle_on_rate_limit,
+            # which caps the wait; urllib3 would sleep for any Retry-After it is sent
+            status_forcelist=[502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+    ))
+    # Authentication headers are built once and sent with every request
+    session.headers.update(get_authentication_header())
+    session.hooks['response'].append(functools.partial(throttle_on_rate_limit, quiet=quiet))
+    return session
+
+
+SESSION = create_session()
+
+
+class User(NamedTuple):
+    """A user with permissions on a repository"""
+    username: str
+    email: str
+    permission: str
+
+
+def parse_json(res):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def dump_json(data):
+    """Serialize data as indented JSON text, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
 def get_projects():
     """Fetch all projects in the organization"""
     url = f'https://dev.azure.com/{ORGANIZATION}/_apis/projects'
-    headers = get_authentication_header()
     params = {
         'api-version': '6.0',
         '$top': 100
@@ -40,12 +167,12 @@ def get_projects():
     projects = []
 
     while url:
-        res = requests.get(url, headers=headers, params=params)
+        res = SESSION.get(url, params=params)
         if res.status_code != 200:
             print(f"Error fetching projects: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
+        data = parse_json(res)
         for project in data.get('value', []):
             projects.append({
                 'id': project['id'],
@@ -54,9 +181,10 @@ def get_projects():
                 'state': project['state']
             })
 
-        # Azure DevOps uses continuation token for pagination
-        if 'continuationToken' in data:
-            params['continuationToken'] = data['continuationToken']
+        # Azure DevOps returns the continuation token in a response header
+        continuation_token = res.headers.get('x-ms-continuationtoken')
+        if continuation_token:
+            params['continuationToken'] = continuation_token
         else:
             url = None
 
@@ -66,18 +194,17 @@ def get_projects():
 def get_repositories(project_id):
     """Fetch all repositories in a project"""
     url = f'https://dev.azure.com/{ORGANIZATION}/{project_id}/_apis/git/repositories'
-    headers = get_authentication_header()
     params = {
         'api-version': '6.0'
     }
     repos = []
 
-    res = requests.get(url, headers=headers, params=params)
+    res = SESSION.get(url, params=params)
     if res.status_code != 200:
         print(f"Error fetching repositories for project {project_id}: {res.status_code} - {res.text}")
         return repos
 
-    data = res.json()
+    data = parse_json(res)
     for repo in data.get('value', []):
         repos.append({
             'id': repo['id'],
@@ -90,128 +217,165 @@ def get_repositories(project_id):
     return repos
 
 
-def get_repository_permissions(repo_id):
-    """Fetch users with permissions on a repository"""
+def get_permissions_and_admin(repo_id):
+    """Fetch users with permissions on a repository and whether admin access is granted"""
     url = f'https://dev.azure.com/{ORGANIZATION}/_apis/git/repositories/{repo_id}/permissions'
-    headers = get_authentication_header()
     params = {
         'api-version': '6.0'
     }
+    is_admin = False
     users = []
 
-    res = requests.get(url, headers=headers, params=params)
+    # A single permissions payload answers both the admin check and the user listing
+    res = SESSION.get(url, params=params)
     if res.status_code != 200:
-        print(f"Error fetching repository permissions: {res.status_code} - {res.text}")
-        return users
+        return is_admin, users
 
-    data = res.json()
+    data = parse_json(res)
     for permission in data.get('value', []):
         # Filter for user permissions (not group permissions)
         if permission.get('identityType') == 'user':
+            if permission.get('permission') in ['Administer', 'Manage']:
+                is_admin = True
             identity = permission.get('identity', {})
-            users.append({
-                'username': identity.get('displayName', identity.get('uniqueName', 'Unknown')),
-                'email': identity.get('uniqueName', ''),
-                'permission': permission.get('permission', 'unknown')
-            })
+            users.append(User(
+                username=identity_display_name(identity),
+                email=identity.get('uniqueName', ''),
+                permission=permission.get('permission', 'unknown')
+            ))
+
+    return is_admin, users
 
-    return users
+
+def get_team_members(project_id, team_id):
+    """Fetch the member identities of a team, reusing earlier results for the same team"""
+    if team_id in TEAM_MEMBERS_CACHE:
+        return TEAM_MEMBERS_CACHE[team_id]
+
+    url = f'https://dev.azure.com/{ORGANIZATION}/_apis/projects/{project_id}/teams/{team_id}/members'
+    params = {
+        'api-version': '6.0'
+    }
+    identities = []
+
+    res = SESSION.get(url, params=params)
+    if res.status_code != 200:
+        return identities
+
+    data = parse_json(res)
+    for member in data.get('value', []):
+        identities.append(member.get('identity', {}))
+
+    TEAM_MEMBERS_CACHE[team_id] = identities
+    return identities
 
 
 def get_project_members(project_id):
     """Fetch all members of a project"""
     url = f'https://dev.azure.com/{ORGANIZATION}/_apis/projects/{project_id}/teams'
-    headers = get_authentication_header()
     params = {
         'api-version': '6.0'
     }
     members = []
 
     # First get all teams in the project
-    res = requests.get(url, headers=headers, params=params)
+    res = SESSION.get(url, params=params)
     if res.status_code != 200:
         print(f"Error fetching teams for project {project_id}: {res.status_code} - {res.text}")
         return members
 
-    teams_data = res.json()
+    teams_data = parse_json(res)
     
     # For each team, get members
     for team in teams_data.get('value', []):
-        team_id = team['id']
-        members_url = f'https://dev.azure.com/{ORGANIZATION}/_apis/projects/{project_id}/teams/{team_id}/members'
-        
-        members_res = requests.get(members_url, headers=headers, params=params)
-        if members_res.status_code == 200:
-            team_members = members_res.json()
-            for member in team_members.get('value', []):
-                identity = member.get('identity', {})
-                members.append({
-                    'username': identity.get('displayName', identity.get('uniqueName', 'Unknown')),
-                    'email': identity.get('uniqueName', ''),
-                    'team': team['name'],
-                    'permission': 'team_member'  # Azure DevOps permissions are more complex
-                })
+        for identity in get_team_members(project_id, team['id']):
+            members.append({
+                'username': identity_display_name(identity),
+                'email': identity.get('uniqueName', ''),
+                'team': team['name'],
+                'permission': 'team_member'  # Azure DevOps permissions are more complex
+            })
 
     return members
 
 
-def check_user_permissions(project_id, repo_id):
-    """Check if current user has admin permissions on repository"""
-    url = f'https://dev.azure.com/{ORGANIZATION}/_apis/git/repositories/{repo_id}/permissions'
-    headers = get_authentication_header()
-    params = {
-        'api-version': '6.0'
-    }
-
-    res = requests.get(url, headers=headers, params=params)
-    if res.status_code != 200:
-        return False
-
-    data = res.json()
-    for permission in data.get('value', []):
-        # Check if current user has admin permissions
-        if permission.get('identityType') == 'user' and permission.get('permission') in ['Administer', 'Manage']:
-            return True
-
-    return False
-
-
-def export_to_csv(data, filename):
-    """Export data to CSV format"""
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['project', 'repository', 'username', 'email', 'permission']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for repo in data:
-            if repo.get('users'):
-                for user in repo['users']:
-                    writer.writerow({
-                        'project': repo['project'],
-                        'repository': repo['repository'],
-                        'username': user['username'],
-                        'email': user.get('email', ''),
-                        'permission': user['permission']
-                    })
-            else:
-                # Write empty row for repositories with no users
-                writer.writerow({
-                    'project': repo['project'],
-                    'repository': repo['repository'],
-                    'username': '',
-                    'email': '',
-                    'permission': ''
-                })
-    
-    print(f"Data exported to {filename}")
-
-
-def export_to_json(data, filename):
-    """Export data to JSON format"""
-    with open(filename, 'w', encoding='utf-8') as jsonfile:
-        json.dump(data, jsonfile, indent=2, ensure_ascii=False)
-    
-    print(f"Data exported to {filename}")
+def print_repo(header, users):
+    """Print a repository and its users with a single write"""
+    lines = [header]
+    if not users:
+        lines.append("   No direct user permissions found.")
+    else:
+        lines.extend(f"   {u.username} ({u.email}) - {u.permission}" for u in users)
+    print('\n'.join(lines))
+
+
+CSV_FIELDNAMES = ['project', 'repository', 'username', 'email', 'permission']
+
+
+def csv_rows(repo):
+    """Build the CSV rows for one repository"""
+    if repo.get('users'):
+        for user in repo['users']:
+            yield (
+                repo['project'],
+                repo['repository'],
+                user.username,
+                user.email,
+                user.permission
+            )
+    else:
+        # Empty row for repositories with no users
+        yield (
+            repo['project'],
+            repo['repository'],
+            '',
+            '',
+            ''
+        )
+
+
+class Exporter:
+    """Write CSV and JSON exports incrementally as each repository is processed"""
+
+    def __init__(self, csv_filename=None, json_filename=None):
+        self.csv_filename = csv_filename
+        self.json_filename = json_filename
+        self.csvfile = None
+        self.jsonfile = None
+        self.json_items = 0
+
+        if csv_filename:
+            self.csvfile = open(csv_filename, 'w', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.csvfile)
+            self.csv_writer.writerow(CSV_FIELDNAMES)
+
+        if json_filename:
+            self.jsonfile = open(json_filename, 'w', encoding='utf-8')
+            self.jsonfile.write('[')
+
+    def write(self, repo):
+        """Append one repository to the open exports"""
+        if self.csvfile:
+            self.csv_writer.writerows(csv_rows(repo))
+
+        if self.jsonfile:
+            # Items are indented to match json.dump(data, indent=2) of the whole list
+            self.jsonfile.write(',\n' if self.json_items else '\n')
+            item = dict(repo, users=[user._asdict() for user in repo['users']])
+            # JSON escapes newlines inside strings, so every newline in the text is structural
+            self.jsonfile.write('  ' + dump_json(item).replace('\n', '\n  '))
+            self.json_items += 1
+
+    def close(self):
+        """Finish and close the open exports"""
+        if self.csvfile:
+            self.csvfile.close()
+            print(f"Data exported to {self.csv_filename}")
+
+        if self.jsonfile:
+            self.jsonfile.write('\n]' if self.json_items else ']')
+            self.jsonfile.close()
+            print(f"Data exported to {self.json_filename}")
 
 
 if __name__ == '__main__':
@@ -219,62 +383,56 @@ if __name__ == '__main__':
     parser.add_argument('--csv', help='Export results to CSV file')
     parser.add_argument('--json', help='Export results to JSON file')
     parser.add_argument('--quiet', action='store_true', help='Suppress console output')
+    parser.add_argument('--cache', action='store_true', help=f'Cache API responses on disk for {CACHE_EXPIRE_AFTER // 60} minutes to speed up re-runs')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Number of concurrent API requests (default: {MAX_WORKERS})')
     
     args = parser.parse_args()
     
-    if not args.quiet:
-        print("Fetching Azure DevOps repositories where you have admin access...")
-    
-    all_repo_data = []
+    SESSION = create_session(cache=args.cache, pool_size=args.workers, quiet=args.quiet)
     
-    # Get all projects
     if not args.quiet:
-        print("Fetching projects...")
-    projects = get_projects()
+        print("Fetching Azure DevOps repositories where you have admin access...")
     
-    for project in projects:
+    exporter = Exporter(args.csv, args.json)
+    repo_count = 0
+
+    # The exports are finished and closed even if the crawl fails part-way
+    try:
+        # Get all projects
         if not args.quiet:
-            print(f"\nProject: {project['name']}")
-        repos = get_repositories(project['id'])
+            print("Fetching projects...")
+        projects = get_projects()
         
-        for repo in repos:
-            if not args.quiet:
-                print(f"Repository: {repo['name']}")
-            
-            # Check if user has admin permissions
-            if check_user_permissions(project['id'], repo['id']):
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # Repo listings for every project are fetched up front, in parallel
+            project_repos = executor.map(get_repositories, [project['id'] for project in projects])
+            for project, repos in zip(projects, project_repos):
                 if not args.quiet:
-                    print("  ✓ You have admin access")
+                    print(f"\nProject: {project['name']}")
+                # Check access for all repos in the project concurrently; results keep repo order
+                results = executor.map(get_permissions_and_admin, [repo['id'] for repo in repos])
                 
-                # Get repository permissions
-                users = get_repository_permissions(repo['id'])
-                if not args.quiet:
-                    if not users:
-                        print("   No direct user permissions found.")
+                for repo, (is_admin, users) in zip(repos, results):
+                    if is_admin:
+                        if not args.quiet:
+                            print_repo(f"Repository: {repo['name']}\n  ✓ You have admin access", users)
+                        
+                        repo_data = {
+                            'project': project['name'],
+                            'repository': repo['name'],
+                            'project_id': project['id'],
+                            'repo_id': repo['id'],
+                            'default_branch': repo['default_branch'],
+                            'web_url': repo['web_url'],
+                            'users': users
+                        }
+                        exporter.write(repo_data)
+                        repo_count += 1
                     else:
-                        for u in users:
-                            print(f"   {u['username']} ({u['email']}) - {u['permission']}")
-                
-                repo_data = {
-                    'project': project['name'],
-                    'repository': repo['name'],
-                    'project_id': project['id'],
-                    'repo_id': repo['id'],
-                    'default_branch': repo['default_branch'],
-                    'web_url': repo['web_url'],
-                    'users': users
-                }
-                all_repo_data.append(repo_data)
-            else:
-                if not args.quiet:
-                    print("  ✗ No admin access")
+                        if not args.quiet:
+                            print(f"Repository: {repo['name']}\n  ✗ No admin access")
 
-    if not args.quiet:
-        print(f"\nFinished. Total repositories with admin access: {len(all_repo_data)}")
-    
-    # Export data if requested
-    if args.csv:
-        export_to_csv(all_repo_data, args.csv)
-    
-    if args.json:
-        export_to_json(all_repo_data, args.json) 
\ No newline at end of file
+        if not args.quiet:
+            print(f"\nFinished. Total repositories with admin access: {repo_count}")
+    finally:
+        exporter.close()
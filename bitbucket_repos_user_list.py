@@ -1,12 +1,24 @@
 import os
 import sys
+import time
 import json
 import csv
 import argparse
+import functools
 import requests
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load .env
 load_dotenv()
 sys.stdout.reconfigure(encoding='utf-8')
@@ -18,18 +30,126 @@ if not USERNAME or not APP_PASSWORD:
     print("Set BITBUCKET_USERNAME and BITBUCKET_APP_PASSWORD in your .env file.")
     exit(1)
 
+# Default number of concurrent API requests (override with --workers)
+MAX_WORKERS = 16
+
+# Pause once fewer requests than this remain in the current rate-limit window
+RATE_LIMIT_THRESHOLD = 10
+
+# Longest pause in seconds while waiting for a rate-limit window to reset
+RATE_LIMIT_MAX_WAIT = 60
+
+# Lifetime in seconds of cached API responses when running with --cache
+CACHE_EXPIRE_AFTER = 3600
+
+
+def throttle_on_rate_limit(res, *args, quiet=False, **kwargs):
+    """Wait when the API reports a nearly exhausted rate limit, retrying a refused request once"""
+    if getattr(res, 'from_cache', False):
+        return None
+
+    delay = 0
+    remaining = res.headers.get('X-RateLimit-Remaining')
+    reset = res.headers.get('X-RateLimit-Reset')
+    if remaining and reset and float(remaining) < RATE_LIMIT_THRESHOLD:
+        # X-RateLimit-Reset is the epoch second at which the window resets
+        delay = float(reset) - time.time() + 1
+    elif res.headers.get('Retry-After', '').isdigit():
+        delay = int(res.headers['Retry-After'])
+
+    # 429 is left out of the adapter's Retry, so every rate-limit wait happens here
+    refused = res.status_code == 429 or (res.status_code == 403 and remaining == '0')
+    if refused and delay > RATE_LIMIT_MAX_WAIT:
+        # Too long to wait; the caller reports the refused request
+        return None
+    if refused:
+        # Pause at least a second even when the API does not say how long to wait
+        delay = max(delay, 1)
+
+    if delay > 0:
+        if not quiet:
+            print(f"Rate limit reached, waiting {int(min(delay, RATE_LIMIT_MAX_WAIT))} seconds...")
+        time.sleep(min(delay, RATE_LIMIT_MAX_WAIT))
+
+    if refused:
+        # Release the refused response's connection; a response returned from a hook
+        # replaces the original one
+        res.close()
+        return res.connection.send(res.request, **kwargs)
+    return None
+
+
+def create_session(cache=False, pool_size=MAX_WORKERS, quiet=False):
+    """Create the HTTP session shared by all API calls"""
+    if cache:
+        # Keep GET responses in a local SQLite file so re-runs skip unchanged requests
+        session = requests_cache.CachedSession(
+            'bitbucket_cache',
+            backend='sqlite',
+            expire_after=CACHE_EXPIRE_AFTER,
+            allowable_methods=['GET'],
+            cache_control=True
+        )
+    else:
+        session = requests.Session()
+
+    # Pooled keep-alive connections are reused across repeated API calls; the pool
+    # holds one connection per worker so concurrent requests never open extra ones
+    session.mount('https://', HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=1.0,
+            # Rate limits (429 and Retry-After) are left to throttle_on_rate_limit,
+            # which caps the wait; urllib3 would sleep for any Retry-After it is sent
+            status_forcelist=[502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+    ))
+    # A single auth object is reused for every request
+    session.auth = HTTPBasicAuth(USERNAME, APP_PASSWORD)
+    session.hooks['response'].append(functools.partial(throttle_on_rate_limit, quiet=quiet))
+    return session
+
+
+SESSION = create_session()
+
+
+class User(NamedTuple):
+    """A user with direct permissions on a repository"""
+    username: str
+    display_name: str
+    permission: str
+
+
+def parse_json(res):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def dump_json(data):
+    """Serialize data as indented JSON text, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
 
 def get_workspaces():
     url = 'https://api.bitbucket.org/2.0/workspaces'
     workspaces = []
 
     while url:
-        res = requests.get(url, auth=HTTPBasicAuth(USERNAME, APP_PASSWORD))
+        res = SESSION.get(url)
         if res.status_code != 200:
             print(f"Error fetching workspaces: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
+        data = parse_json(res)
         for ws in data.get('values', []):
             workspaces.append(ws['slug'])
 
@@ -47,12 +167,12 @@ def get_admin_repos(workspace):
     repos = []
 
     while url:
-        res = requests.get(url, auth=HTTPBasicAuth(USERNAME, APP_PASSWORD), params=params)
+        res = SESSION.get(url, params=params)
         if res.status_code != 200:
             print(f"Error fetching repos for {workspace}: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
+        data = parse_json(res)
         for repo in data.get('values', []):
             repos.append({
                 'slug': repo['slug'],
@@ -70,61 +190,102 @@ def get_repo_users(workspace, repo_slug):
     users = []
 
     while url:
-        res = requests.get(url, auth=HTTPBasicAuth(USERNAME, APP_PASSWORD))
+        res = SESSION.get(url)
         if res.status_code != 200:
             print(f"Error fetching users for repo {repo_slug}: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
+        data = parse_json(res)
         for entry in data.get('values', []):
             user_info = entry.get('user', {})
-            users.append({
-                'username': user_info.get('username'),
-                'display_name': user_info.get('display_name'),
-                'permission': entry.get('permission')
-            })
+            users.append(User(
+                username=user_info.get('username'),
+                display_name=user_info.get('display_name'),
+                permission=entry.get('permission')
+            ))
 
         url = data.get('next')
 
     return users
 
 
-def export_to_csv(data, filename):
-    """Export data to CSV format"""
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['workspace', 'repository', 'username', 'display_name', 'permission']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for repo in data:
-            if repo.get('users'):
-                for user in repo['users']:
-                    writer.writerow({
-                        'workspace': repo['workspace'],
-                        'repository': repo['full_name'],
-                        'username': user['username'],
-                        'display_name': user['display_name'],
-                        'permission': user['permission']
-                    })
-            else:
-                # Write empty row for repositories with no users
-                writer.writerow({
-                    'workspace': repo['workspace'],
-                    'repository': repo['full_name'],
-                    'username': '',
-                    'display_name': '',
-                    'permission': ''
-                })
-    
-    print(f"Data exported to {filename}")
+def print_repo(header, users):
+    """Print a repository and its users with a single write"""
+    lines = [header]
+    if not users:
+        lines.append("   No direct user permissions found.")
+    else:
+        lines.extend(f"   {u.display_name} ({u.username}) - {u.permission}" for u in users)
+    print('\n'.join(lines))
 
 
-def export_to_json(data, filename):
-    """Export data to JSON format"""
-    with open(filename, 'w', encoding='utf-8') as jsonfile:
-        json.dump(data, jsonfile, indent=2, ensure_ascii=False)
-    
-    print(f"Data exported to {filename}")
+CSV_FIELDNAMES = ['workspace', 'repository', 'username', 'display_name', 'permission']
+
+
+def csv_rows(repo):
+    """Build the CSV rows for one repository"""
+    if repo.get('users'):
+        for user in repo['users']:
+            yield (
+                repo['workspace'],
+                repo['full_name'],
+                user.username,
+                user.display_name,
+                user.permission
+            )
+    else:
+        # Empty row for repositories with no users
+        yield (
+            repo['workspace'],
+            repo['full_name'],
+            '',
+            '',
+            ''
+        )
+
+
+class Exporter:
+    """Write CSV and JSON exports incrementally as each repository is processed"""
+
+    def __init__(self, csv_filename=None, json_filename=None):
+        self.csv_filename = csv_filename
+        self.json_filename = json_filename
+        self.csvfile = None
+        self.jsonfile = None
+        self.json_items = 0
+
+        if csv_filename:
+            self.csvfile = open(csv_filename, 'w', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.csvfile)
+            self.csv_writer.writerow(CSV_FIELDNAMES)
+
+        if json_filename:
+            self.jsonfile = open(json_filename, 'w', encoding='utf-8')
+            self.jsonfile.write('[')
+
+    def write(self, repo):
+        """Append one repository to the open exports"""
+        if self.csvfile:
+            self.csv_writer.writerows(csv_rows(repo))
+
+        if self.jsonfile:
+            # Items are indented to match json.dump(data, indent=2) of the whole list
+            self.jsonfile.write(',\n' if self.json_items else '\n')
+            item = dict(repo, users=[user._asdict() for user in repo['users']])
+            # JSON escapes newlines inside strings, so every newline in the text is structural
+            self.jsonfile.write('  ' + dump_json(item).replace('\n', '\n  '))
+            self.json_items += 1
+
+    def close(self):
+        """Finish and close the open exports"""
+        if self.csvfile:
+            self.csvfile.close()
+            print(f"Data exported to {self.csv_filename}")
+
+        if self.jsonfile:
+            self.jsonfile.write('\n]' if self.json_items else ']')
+            self.jsonfile.close()
+            print(f"Data exported to {self.json_filename}")
 
 
 if __name__ == '__main__':
@@ -132,44 +293,44 @@ if __name__ == '__main__':
     parser.add_argument('--csv', help='Export results to CSV file')
     parser.add_argument('--json', help='Export results to JSON file')
     parser.add_argument('--quiet', action='store_true', help='Suppress console output')
+    parser.add_argument('--cache', action='store_true', help=f'Cache API responses on disk for {CACHE_EXPIRE_AFTER // 60} minutes to speed up re-runs')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Number of concurrent API requests (default: {MAX_WORKERS})')
     
     args = parser.parse_args()
     
+    SESSION = create_session(cache=args.cache, pool_size=args.workers, quiet=args.quiet)
+    
     if not args.quiet:
         print("Fetching workspaces...")
     workspaces = get_workspaces()
 
-    all_repo_data = []
+    exporter = Exporter(args.csv, args.json)
+    repo_count = 0
 
-    for ws in workspaces:
-        if not args.quiet:
-            print(f"\nWorkspace: {ws}")
-        repos = get_admin_repos(ws)
-        for repo in repos:
-            if not args.quiet:
-                print(f"Repo: {repo['full_name']}")
-            users = get_repo_users(ws, repo['slug'])
-            if not args.quiet:
-                if not users:
-                    print("   No direct user permissions found.")
-                else:
-                    for u in users:
-                        print(f"   {u['display_name']} ({u['username']}) - {u['permission']}")
-            
-            repo_data = {
-                'workspace': ws,
-                'slug': repo['slug'],
-                'full_name': repo['full_name'],
-                'users': users
-            }
-            all_repo_data.append(repo_data)
+    # The exports are finished and closed even if the crawl fails part-way
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # Repo listings for every workspace are fetched up front, in parallel
+            workspace_repos = executor.map(get_admin_repos, workspaces)
+            for ws, repos in zip(workspaces, workspace_repos):
+                if not args.quiet:
+                    print(f"\nWorkspace: {ws}")
+                # Fetch users for all repos in the workspace concurrently; results keep repo order
+                repo_users = executor.map(get_repo_users, [ws] * len(repos), [repo['slug'] for repo in repos])
+                for repo, users in zip(repos, repo_users):
+                    if not args.quiet:
+                        print_repo(f"Repo: {repo['full_name']}", users)
+                    
+                    repo_data = {
+                        'workspace': ws,
+                        'slug': repo['slug'],
+                        'full_name': repo['full_name'],
+                        'users': users
+                    }
+                    exporter.write(repo_data)
+                    repo_count += 1
 
-    if not args.quiet:
-        print(f"\nFinished. Total repositories checked: {len(all_repo_data)}")
-    
-    # Export data if requested
-    if args.csv:
-        export_to_csv(all_repo_data, args.csv)
-    
-    if args.json:
-        export_to_json(all_repo_data, args.json)
+        if not args.quiet:
+            print(f"\nFinished. Total repositories checked: {repo_count}")
+    finally:
+        exporter.close()
@@ -1,12 +1,24 @@
 import os
 import sys
+import time
 import json
 import csv
 import argparse
+import functools
 import requests
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load .env
 load_dotenv()
 sys.stdout.reconfigure(encoding='utf-8')
@@ -18,23 +30,135 @@ if not USERNAME or not TOKEN:
     print("Set GITHUB_USERNAME and GITHUB_TOKEN in your .env file.")
     exit(1)
 
+# Default number of concurrent API requests (override with --workers)
+MAX_WORKERS = 16
+
+# Pause once fewer requests than this remain in the current rate-limit window
+RATE_LIMIT_THRESHOLD = 10
+
+# Longest pause in seconds while waiting for a rate-limit window to reset
+RATE_LIMIT_MAX_WAIT = 60
+
+# Lifetime in seconds of cached API responses when running with --cache
+CACHE_EXPIRE_AFTER = 3600
+
+
+def throttle_on_rate_limit(res, *args, quiet=False, **kwargs):
+    """Wait when the API reports a nearly exhausted rate limit, retrying a refused request once"""
+    if getattr(res, 'from_cache', False):
+        return None
+
+    delay = 0
+    remaining = res.headers.get('X-RateLimit-Remaining')
+    reset = res.headers.get('X-RateLimit-Reset')
+    if remaining and reset and float(remaining) < RATE_LIMIT_THRESHOLD:
+        # X-RateLimit-Reset is the epoch second at which the window resets
+        delay = float(reset) - time.time() + 1
+    elif res.headers.get('Retry-After', '').isdigit():
+        delay = int(res.headers['Retry-After'])
+
+    # 429 is left out of the adapter's Retry, so every rate-limit wait happens here
+    refused = res.status_code == 429 or (res.status_code == 403 and remaining == '0')
+    if refused and delay > RATE_LIMIT_MAX_WAIT:
+        # Too long to wait; the caller reports the refused request
+        return None
+    if refused:
+        # Pause at least a second even when the API does not say how long to wait
+        delay = max(delay, 1)
+
+    if delay > 0:
+        if not quiet:
+            print(f"Rate limit reached, waiting {int(min(delay, RATE_LIMIT_MAX_WAIT))} seconds...")
+        time.sleep(min(delay, RATE_LIMIT_MAX_WAIT))
+
+    if refused:
+        # Release the refused response's connection; a response returned from a hook
+        # replaces the original one
+        res.close()
+        return res.connection.send(res.request, **kwargs)
+    return None
+
+
+def create_session(cache=False, pool_size=MAX_WORKERS, quiet=False):
+    """Create the HTTP session shared by all API calls"""
+    if cache:
+        # Keep GET responses in a local SQLite file. Every cached request is revalidated
+        # with If-None-Match: GitHub does not count 304 responses against the rate limit,
+        # so re-runs stay current while unchanged pages cost neither quota nor bandwidth
+        session = requests_cache.CachedSession(
+            'github_cache',
+            backend='sqlite',
+            expire_after=CACHE_EXPIRE_AFTER,
+            allowable_methods=['GET'],
+            cache_control=True,
+            always_revalidate=True
+        )
+    else:
+        session = requests.Session()
+
+    # Pooled keep-alive connections are reused across repeated API calls; the pool
+    # holds one connection per worker so concurrent requests never open extra ones
+    session.mount('https://', HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=1.0,
+            # Rate limits (429 and Retry-After) are left to throttle_on_rate_limit,
+            # which caps the wait; urllib3 would sleep for any Retry-After it is sent
+            status_forcelist=[502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+    ))
+    session.hooks['response'].append(functools.partial(throttle_on_rate_limit, quiet=quiet))
+    session.headers.update({
+        'Authorization': f'token {TOKEN}',
+        'Accept': 'application/vnd.github.v3+json'
+    })
+    return session
+
+
+SESSION = create_session()
+
+
+class User(NamedTuple):
+    """A collaborator with direct access to a repository"""
+    username: str
+    display_name: str
+    permission: str
+
+
+def parse_json(res):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def dump_json(data):
+    """Serialize data as indented JSON text, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
 
 def get_user_organizations():
     """Fetch all organizations the user belongs to"""
     url = 'https://api.github.com/user/orgs'
-    headers = {
-        'Authorization': f'token {TOKEN}',
-        'Accept': 'application/vnd.github.v3+json'
+    params = {
+        'per_page': 100
     }
     orgs = []
 
     while url:
-        res = requests.get(url, headers=headers)
+        res = SESSION.get(url, params=params)
         if res.status_code != 200:
             print(f"Error fetching organizations: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
+        data = parse_json(res)
         for org in data:
             orgs.append(org['login'])
 
@@ -50,10 +174,6 @@ def get_user_organizations():
 def get_admin_repos():
     """Fetch all repositories where user has admin access"""
     url = 'https://api.github.com/user/repos'
-    headers = {
-        'Authorization': f'token {TOKEN}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
     params = {
         'type': 'all',  # all, owner, public, private, member
         'sort': 'updated',
@@ -62,12 +182,12 @@ def get_admin_repos():
     repos = []
 
     while url:
-        res = requests.get(url, headers=headers, params=params)
+        res = SESSION.get(url, params=params)
         if res.status_code != 200:
             print(f"Error fetching repos: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
+        data = parse_json(res)
         for repo in data:
             # Check if user has admin permissions
             if repo.get('permissions', {}).get('admin', False):
@@ -88,36 +208,28 @@ def get_admin_repos():
     return repos
 
 
-def get_org_admin_repos(org):
-    """Fetch repositories in organization where user has admin access"""
-    url = f'https://api.github.com/orgs/{org}/repos'
-    headers = {
-        'Authorization': f'token {TOKEN}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
+@functools.lru_cache(maxsize=None)
+def get_repo_collaborators(owner, repo_name):
+    """Fetch users with direct access to repository"""
+    url = f'https://api.github.com/repos/{owner}/{repo_name}/collaborators'
     params = {
-        'type': 'all',
         'per_page': 100
     }
-    repos = []
+    users = []
 
     while url:
-        res = requests.get(url, headers=headers, params=params)
+        res = SESSION.get(url, params=params)
         if res.status_code != 200:
-            print(f"Error fetching repos for org {org}: {res.status_code} - {res.text}")
+            print(f"Error fetching collaborators for {owner}/{repo_name}: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
-        for repo in data:
-            # Check if user has admin permissions
-            if repo.get('permissions', {}).get('admin', False):
-                repos.append({
-                    'name': repo['name'],
-                    'full_name': repo['full_name'],
-                    'owner': repo['owner']['login'],
-                    'private': repo['private'],
-                    'html_url': repo['html_url']
-                })
+        data = parse_json(res)
+        for user in data:
+            users.append(User(
+                username=user['login'],
+                display_name=user.get('name', user['login']),
+                permission=user.get('role_name', 'unknown')
+            ))
 
         # GitHub uses Link header for pagination
         if 'next' in res.links:
@@ -125,82 +237,171 @@ def get_org_admin_repos(org):
         else:
             url = None
 
-    return repos
+    return users
 
 
-def get_repo_collaborators(owner, repo_name):
-    """Fetch users with direct access to repository"""
-    url = f'https://api.github.com/repos/{owner}/{repo_name}/collaborators'
-    headers = {
-        'Authorization': f'token {TOKEN}',
-        'Accept': 'application/vnd.github.v3+json'
+# Lists an organization's repositories together with their direct collaborators,
+# so one request covers up to 100 repositories instead of one request per repository
+ORG_REPOS_QUERY = """
+query($login: String!, $cursor: String) {
+  organization(login: $login) {
+    repositories(first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        nameWithOwner
+        owner { login }
+        isPrivate
+        url
+        viewerPermission
+        collaborators(first: 100) {
+          pageInfo { hasNextPage }
+          edges { permission node { login name } }
+        }
+      }
     }
-    params = {
-        'per_page': 100
+  }
+}
+"""
+
+
+def get_org_admin_repos(org):
+    """Fetch repositories in organization where user has admin access, with their collaborators"""
+    url = 'https://api.github.com/graphql'
+    variables = {
+        'login': org,
+        'cursor': None
     }
-    users = []
+    repos = []
 
-    while url:
-        res = requests.get(url, headers=headers, params=params)
+    while True:
+        res = SESSION.post(url, json={'query': ORG_REPOS_QUERY, 'variables': variables})
         if res.status_code != 200:
-            print(f"Error fetching collaborators for {owner}/{repo_name}: {res.status_code} - {res.text}")
+            print(f"Error fetching repos for org {org}: {res.status_code} - {res.text}")
             break
 
-        data = res.json()
-        for user in data:
-            users.append({
-                'username': user['login'],
-                'display_name': user.get('name', user['login']),
-                'permission': user.get('role_name', 'unknown')
-            })
+        data = parse_json(res)
+        organization = (data.get('data') or {}).get('organization')
+        if not organization:
+            print(f"Error fetching repos for org {org}: {data.get('errors')}")
+            break
 
-        # GitHub uses Link header for pagination
-        if 'next' in res.links:
-            url = res.links['next']['url']
-        else:
-            url = None
+        for repo in organization['repositories']['nodes']:
+            # Check if user has admin permissions
+            if repo['viewerPermission'] != 'ADMIN':
+                continue
 
-    return users
+            collaborators = repo.get('collaborators')
+            if collaborators is None or collaborators['pageInfo']['hasNextPage']:
+                # Fall back to the paginated REST endpoint for very large collaborator lists
+                users = get_repo_collaborators(repo['owner']['login'], repo['name'])
+            else:
+                users = []
+                for edge in collaborators['edges']:
+                    user = edge['node']
+                    users.append(User(
+                        username=user['login'],
+                        display_name=user.get('name') or user['login'],
+                        permission=edge['permission'].lower()
+                    ))
+
+            repos.append({
+                'name': repo['name'],
+                'full_name': repo['nameWithOwner'],
+                'owner': repo['owner']['login'],
+                'private': repo['isPrivate'],
+                'html_url': repo['url'],
+                'users': users
+            })
 
+        # GraphQL uses cursors for pagination
+        page_info = organization['repositories']['pageInfo']
+        if not page_info['hasNextPage']:
+            break
+        variables['cursor'] = page_info['endCursor']
 
-def export_to_csv(data, filename):
-    """Export data to CSV format"""
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['repository', 'type', 'owner', 'username', 'display_name', 'permission']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for repo in data:
-            if repo.get('users'):
-                for user in repo['users']:
-                    writer.writerow({
-                        'repository': repo['full_name'],
-                        'type': repo.get('type', 'personal'),
-                        'owner': repo.get('owner', ''),
-                        'username': user['username'],
-                        'display_name': user['display_name'],
-                        'permission': user['permission']
-                    })
-            else:
-                # Write empty row for repositories with no users
-                writer.writerow({
-                    'repository': repo['full_name'],
-                    'type': repo.get('type', 'personal'),
-                    'owner': repo.get('owner', ''),
-                    'username': '',
-                    'display_name': '',
-                    'permission': ''
-                })
-    
-    print(f"Data exported to {filename}")
+    return repos
 
 
-def export_to_json(data, filename):
-    """Export data to JSON format"""
-    with open(filename, 'w', encoding='utf-8') as jsonfile:
-        json.dump(data, jsonfile, indent=2, ensure_ascii=False)
-    
-    print(f"Data exported to {filename}")
+def print_repo(header, users):
+    """Print a repository and its users with a single write"""
+    lines = [header]
+    if not users:
+        lines.append("   No direct collaborators found.")
+    else:
+        lines.extend(f"   {u.display_name} ({u.username}) - {u.permission}" for u in users)
+    print('\n'.join(lines))
+
+
+CSV_FIELDNAMES = ['repository', 'type', 'owner', 'username', 'display_name', 'permission']
+
+
+def csv_rows(repo):
+    """Build the CSV rows for one repository"""
+    if repo.get('users'):
+        for user in repo['users']:
+            yield (
+                repo['full_name'],
+                repo.get('type', 'personal'),
+                repo.get('owner', ''),
+                user.username,
+                user.display_name,
+                user.permission
+            )
+    else:
+        # Empty row for repositories with no users
+        yield (
+            repo['full_name'],
+            repo.get('type', 'personal'),
+            repo.get('owner', ''),
+            '',
+            '',
+            ''
+        )
+
+
+class Exporter:
+    """Write CSV and JSON exports incrementally as each repository is processed"""
+
+    def __init__(self, csv_filename=None, json_filename=None):
+        self.csv_filename = csv_filename
+        self.json_filename = json_filename
+        self.csvfile = None
+        self.jsonfile = None
+        self.json_items = 0
+
+        if csv_filename:
+            self.csvfile = open(csv_filename, 'w', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.csvfile)
+            self.csv_writer.writerow(CSV_FIELDNAMES)
+
+        if json_filename:
+            self.jsonfile = open(json_filename, 'w', encoding='utf-8')
+            self.jsonfile.write('[')
+
+    def write(self, repo):
+        """Append one repository to the open exports"""
+        if self.csvfile:
+            self.csv_writer.writerows(csv_rows(repo))
+
+        if self.jsonfile:
+            # Items are indented to match json.dump(data, indent=2) of the whole list
+            self.jsonfile.write(',\n' if self.json_items else '\n')
+            item = dict(repo, users=[user._asdict() for user in repo['users']])
+            # JSON escapes newlines inside strings, so every newline in the text is structural
+            self.jsonfile.write('  ' + dump_json(item).replace('\n', '\n  '))
+            self.json_items += 1
+
+    def close(self):
+        """Finish and close the open exports"""
+        if self.csvfile:
+            self.csvfile.close()
+            print(f"Data exported to {self.csv_filename}")
+
+        if self.jsonfile:
+            self.jsonfile.write('\n]' if self.json_items else ']')
+            self.jsonfile.close()
+            print(f"Data exported to {self.json_filename}")
 
 
 if __name__ == '__main__':
@@ -208,78 +409,77 @@ if __name__ == '__main__':
     parser.add_argument('--csv', help='Export results to CSV file')
     parser.add_argument('--json', help='Export results to JSON file')
     parser.add_argument('--quiet', action='store_true', help='Suppress console output')
+    parser.add_argument('--cache', action='store_true', help=f'Cache API responses on disk for {CACHE_EXPIRE_AFTER // 60} minutes to speed up re-runs')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Number of concurrent API requests (default: {MAX_WORKERS})')
     
     args = parser.parse_args()
     
-    if not args.quiet:
-        print("Fetching GitHub repositories where you have admin access...")
-    
-    all_repo_data = []
+    SESSION = create_session(cache=args.cache, pool_size=args.workers, quiet=args.quiet)
     
-    # Get user's own repositories
     if not args.quiet:
-        print("\n=== Personal Repositories ===")
-    personal_repos = get_admin_repos()
-    for repo in personal_repos:
-        if not args.quiet:
-            print(f"Repo: {repo['full_name']}")
-        users = get_repo_collaborators(repo['owner'], repo['name'])
-        if not args.quiet:
-            if not users:
-                print("   No direct collaborators found.")
-            else:
-                for u in users:
-                    print(f"   {u['display_name']} ({u['username']}) - {u['permission']}")
-        
-        repo_data = {
-            'full_name': repo['full_name'],
-            'name': repo['name'],
-            'owner': repo['owner'],
-            'type': 'personal',
-            'private': repo['private'],
-            'html_url': repo['html_url'],
-            'users': users
-        }
-        all_repo_data.append(repo_data)
-    
-    # Get organization repositories
-    if not args.quiet:
-        print("\n=== Organization Repositories ===")
-    orgs = get_user_organizations()
+        print("Fetching GitHub repositories where you have admin access...")
     
-    for org in orgs:
-        if not args.quiet:
-            print(f"\nOrganization: {org}")
-        org_repos = get_org_admin_repos(org)
-        for repo in org_repos:
+    exporter = Exporter(args.csv, args.json)
+    repo_count = 0
+
+    # The exports are finished and closed even if the crawl fails part-way
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # Repos of the user's organizations are reported by the organization pass,
+            # which lists them together with their collaborators
+            orgs = get_user_organizations()
+            org_logins = set(orgs)
+            
+            # Get user's own repositories
             if not args.quiet:
-                print(f"Repo: {repo['full_name']}")
-            users = get_repo_collaborators(repo['owner'], repo['name'])
+                print("\n=== Personal Repositories ===")
+            personal_repos = [repo for repo in get_admin_repos() if repo['owner'] not in org_logins]
+            # Fetch collaborators for all repos concurrently; results keep repo order
+            repo_users = executor.map(get_repo_collaborators, [r['owner'] for r in personal_repos], [r['name'] for r in personal_repos])
+            for repo, users in zip(personal_repos, repo_users):
+                if not args.quiet:
+                    print_repo(f"Repo: {repo['full_name']}", users)
+                
+                repo_data = {
+                    'full_name': repo['full_name'],
+                    'name': repo['name'],
+                    'owner': repo['owner'],
+                    'type': 'personal',
+                    'private': repo['private'],
+                    'html_url': repo['html_url'],
+                    'users': users
+                }
+                exporter.write(repo_data)
+                repo_count += 1
+            
+            # Get organization repositories
             if not args.quiet:
-                if not users:
-                    print("   No direct collaborators found.")
-                else:
-                    for u in users:
-                        print(f"   {u['display_name']} ({u['username']}) - {u['permission']}")
+                print("\n=== Organization Repositories ===")
             
-            repo_data = {
-                'full_name': repo['full_name'],
-                'name': repo['name'],
-                'owner': repo['owner'],
-                'type': 'organization',
-                'organization': org,
-                'private': repo['private'],
-                'html_url': repo['html_url'],
-                'users': users
-            }
-            all_repo_data.append(repo_data)
+            # Repo listings (with collaborators) for every organization are fetched up front, in parallel
+            org_repo_lists = executor.map(get_org_admin_repos, orgs)
+            for org, org_repos in zip(orgs, org_repo_lists):
+                if not args.quiet:
+                    print(f"\nOrganization: {org}")
+                for repo in org_repos:
+                    users = repo['users']
+                    if not args.quiet:
+                        print_repo(f"Repo: {repo['full_name']}", users)
+                    
+                    repo_data = {
+                        'full_name': repo['full_name'],
+                        'name': repo['name'],
+                        'owner': repo['owner'],
+                        'type': 'organization',
+                        'organization': org,
+                        'private': repo['private'],
+                        'html_url': repo['html_url'],
+                        'users': users
+                    }
+                    exporter.write(repo_data)
+                    repo_count += 1
 
-    if not args.quiet:
-        print(f"\nFinished. Total repositories checked: {len(all_repo_data)}")
-    
-    # Export data if requested
-    if args.csv:
-        export_to_csv(all_repo_data, args.csv)
-    
-    if args.json:
-        export_to_json(all_repo_data, args.json) 
\ No newline at end of file
+        if not args.quiet:
+            print(f"\nFinished. Total repositories checked: {repo_count}")
+    finally:
+        exporter.close()
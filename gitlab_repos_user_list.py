@@ -3,10 +3,21 @@ import sys
 import json
 import csv
 import argparse
+import atexit
 import requests
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load .env
 load_dotenv()
 sys.stdout.reconfigure(encoding='utf-8')
@@ -18,293 +29,487 @@ if not TOKEN:
     print("Set GITLAB_TOKEN in your .env file.")
     exit(1)
 
+# Default number of projects whose members are fetched concurrently (override with --workers)
+MAX_WORKERS = 16
+
+# Lifetime in seconds of cached API responses when running with --cache
+CACHE_EXPIRE_AFTER = 3600
+
+# Readable names for GitLab access levels
+ACCESS_LEVELS = {
+    50: 'owner',
+    40: 'maintainer',
+    30: 'developer',
+    20: 'reporter',
+    10: 'guest'
+}
+
+# Maximum number of pages of one listing fetched at the same time
+PAGE_WORKERS = 10
+PAGE_EXECUTOR = ThreadPoolExecutor(max_workers=PAGE_WORKERS)
+
+
+def create_session(cache=False, pool_size=MAX_WORKERS + PAGE_WORKERS):
+    """Create the HTTP session shared by all API calls"""
+    if cache:
+        # Keep GET responses in a local SQLite file so re-runs skip unchanged requests
+        session = requests_cache.CachedSession(
+            'gitlab_cache',
+            backend='sqlite',
+            expire_after=CACHE_EXPIRE_AFTER,
+            allowable_methods=['GET']
+        )
+    else:
+        session = requests.Session()
+
+    # Pooled keep-alive connections are reused across repeated API calls, and
+    # transient failures are retried with backoff instead of ending a listing early;
+    # the pool holds one connection per concurrent request so none are discarded
+    session.mount('https://', HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            # The only POST is the read-only GraphQL group projects query
+            allowed_methods=['GET', 'POST'],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    ))
+    session.headers.update({
+        'Authorization': f'Bearer {TOKEN}',
+        'Content-Type': 'application/json'
+    })
+    atexit.register(session.close)
+    return session
+
+
+SESSION = create_session()
+
+
+class Project(NamedTuple):
+    """A project where the user has maintainer or owner access"""
+    id: int
+    name: str
+    path: str
+    full_path: str
+    web_url: str
+
+
+class Member(NamedTuple):
+    """A user with direct access to a project"""
+    username: str
+    display_name: str
+    permission: str
+    access_level: int
+
+
+def parse_json(res):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def dump_json(data):
+    """Serialize data as indented JSON text, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def dump_json_line(data):
+    """Serialize data as compact single-line JSON text, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def get_all_pages(url, params, what, build):
+    """Fetch every page of a GitLab list endpoint
+
+    GitLab reports the page count in the X-Total-Pages header, so once the
+    first page is in, the remaining pages are requested concurrently. Each
+    item is turned into a record with build() as soon as its page is decoded,
+    so only the records are kept, not the raw pages.
+    """
+    def page_records(res):
+        return [build(item) for item in parse_json(res)]
+
+    res = SESSION.get(url, params=params)
+    if res.status_code != 200:
+        print(f"Error fetching {what}: {res.status_code} - {res.text}")
+        return []
+
+    records = page_records(res)
+    total_pages = res.headers.get('X-Total-Pages')
+
+    if total_pages:
+        def get_page(page):
+            page_res = SESSION.get(url, params={**params, 'page': page})
+            if page_res.status_code != 200:
+                print(f"Error fetching {what}: {page_res.status_code} - {page_res.text}")
+                return []
+            return page_records(page_res)
+
+        for page in PAGE_EXECUTOR.map(get_page, range(2, int(total_pages) + 1)):
+            records.extend(page)
+    else:
+        # X-Total-Pages is omitted for very large listings, so follow the Link header
+        while 'next' in res.links:
+            res = SESSION.get(res.links['next']['url'])
+            if res.status_code != 200:
+                print(f"Error fetching {what}: {res.status_code} - {res.text}")
+                break
+            records.extend(page_records(res))
+
+    return records
+
+
+def group_record(group):
+    """Keep the fields used from a group API item"""
+    return {
+        'id': group['id'],
+        'name': group['name'],
+        'path': group['path'],
+        'full_path': group['full_path']
+    }
+
+
+def project_record(project):
+    """Keep the fields used from a project API item"""
+    return Project(
+        id=project['id'],
+        name=project['name'],
+        path=project['path'],
+        full_path=project['path_with_namespace'],
+        web_url=project['web_url']
+    )
+
+
+def member_record(user):
+    """Keep the fields used from a project member API item"""
+    access_level = user.get('access_level', 0)
+    return Member(
+        username=user['username'],
+        display_name=user.get('name', user['username']),
+        permission=ACCESS_LEVELS.get(access_level, 'unknown'),
+        access_level=access_level
+    )
+
 
 def get_user_groups():
     """Fetch all groups the user belongs to"""
     url = f'{GITLAB_URL}/api/v4/groups'
-    headers = {
-        'Authorization': f'Bearer {TOKEN}',
-        'Content-Type': 'application/json'
-    }
     params = {
         'per_page': 100
     }
-    groups = []
-
-    while url:
-        res = requests.get(url, headers=headers, params=params)
-        if res.status_code != 200:
-            print(f"Error fetching groups: {res.status_code} - {res.text}")
-            break
-
-        data = res.json()
-        for group in data:
-            groups.append({
-                'id': group['id'],
-                'name': group['name'],
-                'path': group['path']
-            })
-
-        # GitLab uses Link header for pagination
-        if 'next' in res.links:
-            url = res.links['next']['url']
-        else:
-            url = None
-
-    return groups
+    return get_all_pages(url, params, 'groups', group_record)
 
 
 def get_user_projects():
     """Fetch all projects where user has maintainer or owner access"""
     url = f'{GITLAB_URL}/api/v4/projects'
-    headers = {
-        'Authorization': f'Bearer {TOKEN}',
-        'Content-Type': 'application/json'
-    }
     params = {
         'membership': True,  # Only projects where user is a member
+        'min_access_level': 40,  # Maintainer = 40
+        'simple': True,  # Only the basic project fields
         'per_page': 100
     }
-    projects = []
-
-    while url:
-        res = requests.get(url, headers=headers, params=params)
-        if res.status_code != 200:
-            print(f"Error fetching projects: {res.status_code} - {res.text}")
-            break
-
-        data = res.json()
-        for project in data:
-            # Check if user has maintainer or owner access
-            if project.get('permissions', {}).get('project_access', {}).get('access_level', 0) >= 40:  # Maintainer = 40
-                projects.append({
-                    'id': project['id'],
-                    'name': project['name'],
-                    'path': project['path'],
-                    'full_path': project['path_with_namespace'],
-                    'visibility': project['visibility'],
-                    'web_url': project['web_url']
-                })
-
-        # GitLab uses Link header for pagination
-        if 'next' in res.links:
-            url = res.links['next']['url']
-        else:
-            url = None
-
-    return projects
+    return get_all_pages(url, params, 'projects', project_record)
 
 
 def get_group_projects(group_id):
     """Fetch projects in group where user has maintainer access"""
     url = f'{GITLAB_URL}/api/v4/groups/{group_id}/projects'
-    headers = {
-        'Authorization': f'Bearer {TOKEN}',
-        'Content-Type': 'application/json'
-    }
     params = {
+        'min_access_level': 40,  # Maintainer = 40
+        'simple': True,  # Only the basic project fields
         'per_page': 100
     }
-    projects = []
-
-    while url:
-        res = requests.get(url, headers=headers, params=params)
-        if res.status_code != 200:
-            print(f"Error fetching group projects: {res.status_code} - {res.text}")
-            break
-
-        data = res.json()
-        for project in data:
-            # Check if user has maintainer or owner access
-            if project.get('permissions', {}).get('project_access', {}).get('access_level', 0) >= 40:  # Maintainer = 40
-                projects.append({
-                    'id': project['id'],
-                    'name': project['name'],
-                    'path': project['path'],
-                    'full_path': project['path_with_namespace'],
-                    'visibility': project['visibility'],
-                    'web_url': project['web_url']
-                })
-
-        # GitLab uses Link header for pagination
-        if 'next' in res.links:
-            url = res.links['next']['url']
-        else:
-            url = None
-
-    return projects
+    return get_all_pages(url, params, 'group projects', project_record)
 
 
 def get_project_members(project_id):
     """Fetch users with direct access to project"""
     url = f'{GITLAB_URL}/api/v4/projects/{project_id}/members'
-    headers = {
-        'Authorization': f'Bearer {TOKEN}',
-        'Content-Type': 'application/json'
-    }
     params = {
         'per_page': 100
     }
-    users = []
+    return get_all_pages(url, params, 'project members', member_record)
+
+
+GROUP_PROJECTS_QUERY = """
+query($fullPath: ID!, $cursor: String) {
+  group(fullPath: $fullPath) {
+    projects(first: 50, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        id
+        name
+        path
+        fullPath
+        webUrl
+        userPermissions { adminProject }
+        projectMembers(relations: [DIRECT], first: 100) {
+          pageInfo { hasNextPage }
+          nodes { user { username name } accessLevel { integerValue } }
+        }
+      }
+    }
+  }
+}
+"""
 
-    while url:
-        res = requests.get(url, headers=headers, params=params)
-        if res.status_code != 200:
-            print(f"Error fetching project members: {res.status_code} - {res.text}")
-            break
 
-        data = res.json()
-        for user in data:
-            # Map access levels to readable names
-            access_level = user.get('access_level', 0)
-            if access_level == 50:
-                permission = 'owner'
-            elif access_level == 40:
-                permission = 'maintainer'
-            elif access_level == 30:
-                permission = 'developer'
-            elif access_level == 20:
-                permission = 'reporter'
-            elif access_level == 10:
-                permission = 'guest'
-            else:
-                permission = 'unknown'
-
-            users.append({
-                'username': user['username'],
-                'display_name': user.get('name', user['username']),
-                'permission': permission,
-                'access_level': access_level
-            })
-
-        # GitLab uses Link header for pagination
-        if 'next' in res.links:
-            url = res.links['next']['url']
+def get_group_admin_projects(group):
+    """Fetch (project, members) pairs for projects in group where user has maintainer access"""
+    url = f'{GITLAB_URL}/api/graphql'
+    variables = {
+        'fullPath': group['full_path'],
+        'cursor': None
+    }
+    projects = []
+
+    while True:
+        res = SESSION.post(url, json={'query': GROUP_PROJECTS_QUERY, 'variables': variables})
+        if res.status_code != 200:
+            group_data = None
+            error = res.status_code
         else:
-            url = None
-
-    return users
-
-
-def export_to_csv(data, filename):
-    """Export data to CSV format"""
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['project', 'type', 'group', 'username', 'display_name', 'permission', 'access_level']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for project in data:
-            if project.get('users'):
-                for user in project['users']:
-                    writer.writerow({
-                        'project': project['full_path'],
-                        'type': project.get('type', 'personal'),
-                        'group': project.get('group', ''),
-                        'username': user['username'],
-                        'display_name': user['display_name'],
-                        'permission': user['permission'],
-                        'access_level': user.get('access_level', '')
-                    })
+            data = parse_json(res)
+            group_data = (data.get('data') or {}).get('group')
+            error = data.get('errors')
+
+        if not group_data:
+            # Older GitLab versions may not have the GraphQL API or support this query, and
+            # a failed query must not lose the group's projects; use the REST endpoints instead
+            print(f"Error fetching group projects with GraphQL, using the REST API: {error}")
+            return [(project, get_project_members(project.id)) for project in get_group_projects(group['id'])]
+
+        for project in group_data['projects']['nodes']:
+            # Maintainers and owners have the adminProject permission
+            if not project['userPermissions']['adminProject']:
+                continue
+
+            # GraphQL ids look like gid://gitlab/Project/123
+            project_id = int(project['id'].rsplit('/', 1)[-1])
+            members = project.get('projectMembers')
+            if members is None or members['pageInfo']['hasNextPage']:
+                # Fall back to the paginated REST endpoint for very large member lists
+                users = get_project_members(project_id)
             else:
-                # Write empty row for projects with no users
-                writer.writerow({
-                    'project': project['full_path'],
-                    'type': project.get('type', 'personal'),
-                    'group': project.get('group', ''),
-                    'username': '',
-                    'display_name': '',
-                    'permission': '',
-                    'access_level': ''
-                })
-    
-    print(f"Data exported to {filename}")
+                users = [
+                    member_record({
+                        'username': member['user']['username'],
+                        'name': member['user']['name'],
+                        'access_level': member['accessLevel']['integerValue']
+                    })
+                    for member in members['nodes'] if member.get('user')
+                ]
+
+            projects.append((
+                Project(
+                    id=project_id,
+                    name=project['name'],
+                    path=project['path'],
+                    full_path=project['fullPath'],
+                    web_url=project['webUrl']
+                ),
+                users
+            ))
+
+        # GraphQL uses cursors for pagination
+        page_info = group_data['projects']['pageInfo']
+        if not page_info['hasNextPage']:
+            break
+        variables['cursor'] = page_info['endCursor']
+
+    return projects
+
+
+def print_project(header, users):
+    """Print a project and its members with a single write"""
+    lines = [header]
+    if not users:
+        lines.append("   No direct members found.")
+    else:
+        lines.extend(f"   {u.display_name} ({u.username}) - {u.permission}" for u in users)
+    print('\n'.join(lines))
+
+
+CSV_FIELDNAMES = ['project', 'type', 'group', 'username', 'display_name', 'permission', 'access_level']
+
+
+def csv_rows(project):
+    """Build the CSV rows for one project"""
+    if project.get('users'):
+        for user in project['users']:
+            yield (
+                project['full_path'],
+                project.get('type', 'personal'),
+                project.get('group', ''),
+                user.username,
+                user.display_name,
+                user.permission,
+                user.access_level
+            )
+    else:
+        # Empty row for projects with no users
+        yield (
+            project['full_path'],
+            project.get('type', 'personal'),
+            project.get('group', ''),
+            '',
+            '',
+            '',
+            ''
+        )
 
 
 def export_to_json(data, filename):
     """Export data to JSON format"""
-    with open(filename, 'w', encoding='utf-8') as jsonfile:
-        json.dump(data, jsonfile, indent=2, ensure_ascii=False)
+    with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as jsonfile:
+        jsonfile.write(dump_json(data))
     
     print(f"Data exported to {filename}")
 
 
+class Exporter:
+    """Write CSV and JSON Lines records as each project is processed and collect projects for the JSON export"""
+
+    def __init__(self, csv_filename=None, json_filename=None, jsonl_filename=None):
+        self.csv_filename = csv_filename
+        self.json_filename = json_filename
+        self.jsonl_filename = jsonl_filename
+        self.csvfile = None
+        self.jsonlfile = None
+        self.json_data = []
+
+        if csv_filename:
+            self.csvfile = open(csv_filename, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+            self.csv_writer = csv.writer(self.csvfile)
+            self.csv_writer.writerow(CSV_FIELDNAMES)
+
+        if jsonl_filename:
+            self.jsonlfile = open(jsonl_filename, 'w', encoding='utf-8', buffering=1 << 20)
+
+    def write(self, project):
+        """Add one project to the exports"""
+        if self.csvfile:
+            self.csv_writer.writerows(csv_rows(project))
+
+        if self.json_filename or self.jsonlfile:
+            item = dict(project, users=[user._asdict() for user in project['users']])
+
+            # JSON Lines holds one project per line, so it is written straight away
+            if self.jsonlfile:
+                self.jsonlfile.write(dump_json_line(item) + '\n')
+
+            # JSON is written as a single document, so projects are only kept when it is requested
+            if self.json_filename:
+                self.json_data.append(item)
+
+    def close(self):
+        """Finish and close the exports"""
+        if self.csvfile:
+            self.csvfile.close()
+            print(f"Data exported to {self.csv_filename}")
+
+        if self.json_filename:
+            export_to_json(self.json_data, self.json_filename)
+
+        if self.jsonlfile:
+            self.jsonlfile.close()
+            print(f"Data exported to {self.jsonl_filename}")
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='GitLab Repository Permission Inspector')
     parser.add_argument('--csv', help='Export results to CSV file')
     parser.add_argument('--json', help='Export results to JSON file')
+    parser.add_argument('--jsonl', help='Export results to JSON Lines file (one project per line, written as it is processed)')
     parser.add_argument('--quiet', action='store_true', help='Suppress console output')
+    parser.add_argument('--cache', action='store_true', help=f'Cache API responses on disk for {CACHE_EXPIRE_AFTER // 60} minutes to speed up re-runs')
+    parser.add_argument('--refresh', action='store_true', help='Clear cached API responses before running (implies --cache)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Number of concurrent API requests (default: {MAX_WORKERS})')
     
     args = parser.parse_args()
     
-    if not args.quiet:
-        print("Fetching GitLab projects where you have maintainer/owner access...")
-    
-    all_repo_data = []
-    
-    # Get user's projects
-    if not args.quiet:
-        print("\n=== Personal Projects ===")
-    personal_projects = get_user_projects()
-    for project in personal_projects:
-        if not args.quiet:
-            print(f"Project: {project['full_path']}")
-        users = get_project_members(project['id'])
-        if not args.quiet:
-            if not users:
-                print("   No direct members found.")
-            else:
-                for u in users:
-                    print(f"   {u['display_name']} ({u['username']}) - {u['permission']}")
-        
-        project_data = {
-            'id': project['id'],
-            'name': project['name'],
-            'full_path': project['full_path'],
-            'type': 'personal',
-            'visibility': project['visibility'],
-            'web_url': project['web_url'],
-            'users': users
-        }
-        all_repo_data.append(project_data)
+    # Member fetches and the page fetches they start run at the same time
+    SESSION = create_session(cache=args.cache or args.refresh, pool_size=args.workers + PAGE_WORKERS)
+    if args.refresh:
+        SESSION.cache.clear()
     
-    # Get group projects
     if not args.quiet:
-        print("\n=== Group Projects ===")
-    groups = get_user_groups()
+        print("Fetching GitLab projects where you have maintainer/owner access...")
     
-    for group in groups:
-        if not args.quiet:
-            print(f"\nGroup: {group['name']} ({group['path']})")
-        group_projects = get_group_projects(group['id'])
-        for project in group_projects:
+    exporter = Exporter(args.csv, args.json, args.jsonl)
+    project_count = 0
+
+    # The exports are finished and closed even if the crawl fails part-way
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            groups = get_user_groups()
+            # Project listings (with members) for every group are fetched up front, in parallel
+            group_projects_list = list(executor.map(get_group_admin_projects, groups))
+            
+            # Projects in the user's groups are reported under their group, with the
+            # members the group listing already returned
+            group_project_ids = {project.id for group_projects in group_projects_list for project, _ in group_projects}
+            
+            # Get user's projects
             if not args.quiet:
-                print(f"Project: {project['full_path']}")
-            users = get_project_members(project['id'])
+                print("\n=== Personal Projects ===")
+            personal_projects = [project for project in get_user_projects() if project.id not in group_project_ids]
+            # Fetch members for all projects concurrently; results keep project order
+            project_members = executor.map(get_project_members, [project.id for project in personal_projects])
+            for project, users in zip(personal_projects, project_members):
+                if not args.quiet:
+                    print_project(f"Project: {project.full_path}", users)
+                
+                project_data = {
+                    'id': project.id,
+                    'name': project.name,
+                    'full_path': project.full_path,
+                    'type': 'personal',
+                    'web_url': project.web_url,
+                    'users': users
+                }
+                exporter.write(project_data)
+                project_count += 1
+            
+            # Get group projects
             if not args.quiet:
-                if not users:
-                    print("   No direct members found.")
-                else:
-                    for u in users:
-                        print(f"   {u['display_name']} ({u['username']}) - {u['permission']}")
+                print("\n=== Group Projects ===")
             
-            project_data = {
-                'id': project['id'],
-                'name': project['name'],
-                'full_path': project['full_path'],
-                'type': 'group',
-                'group': group['name'],
-                'visibility': project['visibility'],
-                'web_url': project['web_url'],
-                'users': users
-            }
-            all_repo_data.append(project_data)
+            # A project reached through more than one group is reported once
+            seen = set()
+            for group, group_projects in zip(groups, group_projects_list):
+                if not args.quiet:
+                    print(f"\nGroup: {group['name']} ({group['path']})")
+                for project, users in group_projects:
+                    if project.id in seen:
+                        continue
+                    seen.add(project.id)
+                    if not args.quiet:
+                        print_project(f"Project: {project.full_path}", users)
+                    
+                    project_data = {
+                        'id': project.id,
+                        'name': project.name,
+                        'full_path': project.full_path,
+                        'type': 'group',
+                        'group': group['name'],
+                        'web_url': project.web_url,
+                        'users': users
+                    }
+                    exporter.write(project_data)
+                    project_count += 1
 
-    if not args.quiet:
-        print(f"\nFinished. Total projects checked: {len(all_repo_data)}")
-    
-    # Export data if requested
-    if args.csv:
-        export_to_csv(all_repo_data, args.csv)
-    
-    if args.json:
-        export_to_json(all_repo_data, args.json) 
\ No newline at end of file
+        if not args.quiet:
+            print(f"\nFinished. Total projects checked: {project_count}")
+    finally:
+        exporter.close()
@@ -19,45 +19,160 @@ import json
 import csv
 import argparse
 import requests
+import requests_cache
 import base64
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 sys.stdout.reconfigure(encoding='utf-8')
 
+# Default number of concurrent API requests per platform (override with --workers);
+# kept low because each platform's requests all go to a single host
+MAX_WORKERS = 8
+
+# Lifetime in seconds of cached API responses when running with --cache
+CACHE_EXPIRE_AFTER = 3600
+
+# User and permission lists change more often than workspaces, orgs and repo lists
+CACHE_URLS_EXPIRE_AFTER = {
+    '*/permissions-config/users': 300,
+    '*/collaborators': 300,
+    '*/members': 300,
+    '*/git/repositories/*/permissions': 300
+}
+
+# Requests left in a rate-limit window below which calls are paced until it resets
+RATE_LIMIT_LOW = 10
+
+# Longest pause in seconds while waiting for a rate-limit window to reset
+RATE_LIMIT_MAX_WAIT = 60
+
+# Readable names for GitLab access levels
+GITLAB_ACCESS_LEVELS = {
+    50: 'owner',
+    40: 'maintainer',
+    30: 'developer',
+    20: 'reporter',
+    10: 'guest'
+}
+
+
+def parse_json(res):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def dump_json(data):
+    """Serialize data as indented JSON text, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
 
 class PlatformInspector:
     """Base class for platform-specific repository inspection"""
     
-    def __init__(self, name):
+    # Names of the response headers holding the requests left and the reset time
+    # (epoch seconds) of the platform's rate-limit window, if it sends them
+    RATE_LIMIT_HEADERS = None
+    
+    def __init__(self, name, max_workers=MAX_WORKERS, cache=None):
         self.name = name
+        self.max_workers = max_workers
         self.repositories = []
         self.errors = []
+        self.session = self._create_session(cache)
+    
+    def _create_session(self, cache=None):
+        """Create the HTTP session shared by all of this platform's API calls"""
+        if cache:
+            # Keep GET responses in this platform's on-disk cache so re-runs skip unchanged
+            # requests; expired entries are revalidated with ETag/Last-Modified, and the
+            # last cached response is used if the API fails
+            session = requests_cache.CachedSession(
+                backend=cache,
+                expire_after=CACHE_EXPIRE_AFTER,
+                urls_expire_after=CACHE_URLS_EXPIRE_AFTER,
+                allowable_methods=['GET'],
+                cache_control=True,
+                stale_if_error=True
+            )
+        else:
+            session = requests.Session()
+        # Pooled keep-alive connections are reused across calls, one per worker;
+        # rate limits and transient server errors are retried with backoff
+        session.mount('https://', HTTPAdapter(
+            pool_maxsize=self.max_workers,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                # The only POST is GitHub's read-only GraphQL query
+                allowed_methods=['GET', 'POST'],
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        ))
+        return session
+    
+    def _request(self, method, url, **kwargs):
+        """Send an API request, pausing when the platform's rate limit runs out"""
+        res = self.session.request(method, url, **kwargs)
+        # Rate-limit headers of a response served from the cache are out of date
+        if not self.RATE_LIMIT_HEADERS or getattr(res, 'from_cache', False):
+            return res
+        
+        remaining_header, reset_header = self.RATE_LIMIT_HEADERS
+        remaining = res.headers.get(remaining_header)
+        reset = res.headers.get(reset_header)
+        if remaining is None or reset is None:
+            return res
+        
+        remaining = int(remaining)
+        wait = int(reset) - time.time()
+        if remaining == 0 and res.status_code in (403, 429):
+            # The request was refused; if the window resets soon, wait for it and retry once
+            if wait <= RATE_LIMIT_MAX_WAIT:
+                time.sleep(max(wait, 0) + 1)
+                res = self.session.request(method, url, **kwargs)
+        elif remaining < RATE_LIMIT_LOW and wait > 0:
+            time.sleep(min(wait, RATE_LIMIT_MAX_WAIT))
+        return res
     
     def inspect(self):
         """Override this method in subclasses"""
         pass
     
     def print_results(self):
-        """Print inspection results"""
+        """Print inspection results with a single write"""
         if not self.repositories:
             print(f"\n{self.name}: No repositories with admin access found.")
             return
         
-        print(f"\n{self.name}:")
-        print("=" * (len(self.name) + 1))
+        lines = [f"\n{self.name}:", "=" * (len(self.name) + 1)]
         
         for repo in self.repositories:
-            print(f"\nRepository: {repo['name']}")
+            lines.append(f"\nRepository: {repo['name']}")
             if repo.get('users'):
-                for user in repo['users']:
-                    print(f"   {user['display_name']} ({user['username']}) - {user['permission']}")
+                lines.extend(f"   {user['display_name']} ({user['username']}) - {user['permission']}" for user in repo['users'])
             else:
-                print("   No direct users found.")
+                lines.append("   No direct users found.")
         
-        print(f"\nTotal repositories: {len(self.repositories)}")
+        lines.append(f"\nTotal repositories: {len(self.repositories)}")
+        print('\n'.join(lines))
     
     def get_export_data(self):
         """Get data in exportable format"""
@@ -72,44 +187,50 @@ class PlatformInspector:
 class BitbucketInspector(PlatformInspector):
     """Bitbucket Cloud repository inspector"""
     
-    def __init__(self):
-        super().__init__("Bitbucket Cloud")
+    def __init__(self, max_workers=MAX_WORKERS, cache=None):
+        super().__init__("Bitbucket Cloud", max_workers, cache)
         self.username = os.environ.get('BITBUCKET_USERNAME')
         self.password = os.environ.get('BITBUCKET_APP_PASSWORD')
         
         if not self.username or not self.password:
             self.errors.append("Missing BITBUCKET_USERNAME or BITBUCKET_APP_PASSWORD")
             return
+        
+        # Credentials are set once on the session instead of on every request
+        self.session.auth = (self.username, self.password)
     
     def inspect(self):
         if self.errors:
             return
         
         try:
-            workspaces = self._get_workspaces()
-            for workspace in workspaces:
-                repos = self._get_admin_repos(workspace)
-                for repo in repos:
-                    users = self._get_repo_users(workspace, repo['slug'])
-                    self.repositories.append({
-                        'name': repo['full_name'],
-                        'workspace': workspace,
-                        'slug': repo['slug'],
-                        'users': users
-                    })
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                workspaces = self._get_workspaces()
+                # Repo listings and per-repo users are fetched concurrently; results keep their order
+                workspace_repos = executor.map(self._get_admin_repos, workspaces)
+                for workspace, repos in zip(workspaces, workspace_repos):
+                    repo_users = executor.map(self._get_repo_users, [workspace] * len(repos), [repo['slug'] for repo in repos])
+                    for repo, users in zip(repos, repo_users):
+                        self.repositories.append({
+                            'name': repo['full_name'],
+                            'workspace': workspace,
+                            'slug': repo['slug'],
+                            'users': users
+                        })
         except Exception as e:
             self.errors.append(f"Error during inspection: {str(e)}")
     
     def _get_workspaces(self):
         url = 'https://api.bitbucket.org/2.0/workspaces'
+        params = {'pagelen': 100}
         workspaces = []
         
         while url:
-            res = requests.get(url, auth=(self.username, self.password))
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 raise Exception(f"Error fetching workspaces: {res.status_code}")
             
-            data = res.json()
+            data = parse_json(res)
             workspaces.extend([ws['slug'] for ws in data.get('values', [])])
             url = data.get('next')
         
@@ -117,15 +238,15 @@ class BitbucketInspector(PlatformInspector):
     
     def _get_admin_repos(self, workspace):
         url = f'https://api.bitbucket.org/2.0/repositories/{workspace}'
-        params = {'role': 'admin', 'pagelen': 50}
+        params = {'role': 'admin', 'pagelen': 100}
         repos = []
         
         while url:
-            res = requests.get(url, auth=(self.username, self.password), params=params)
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 raise Exception(f"Error fetching repos for {workspace}: {res.status_code}")
             
-            data = res.json()
+            data = parse_json(res)
             for repo in data.get('values', []):
                 repos.append({
                     'slug': repo['slug'],
@@ -137,15 +258,20 @@ class BitbucketInspector(PlatformInspector):
     
     def _get_repo_users(self, workspace, repo_slug):
         url = f"https://api.bitbucket.org/2.0/repositories/{workspace}/{repo_slug}/permissions-config/users"
+        params = {'pagelen': 100}
         users = []
         
         while url:
-            res = requests.get(url, auth=(self.username, self.password))
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 break
             
-            data = res.json()
-            for entry in data.get('values', []):
+            data = parse_json(res)
+            values = data.get('values', [])
+            if not values:
+                # An empty page means there are no more users, whatever 'next' says
+                break
+            for entry in values:
                 user_info = entry.get('user', {})
                 users.append({
                     'username': user_info.get('username'),
@@ -157,147 +283,150 @@ class BitbucketInspector(PlatformInspector):
         return users
 
 
+GITHUB_REPOS_QUERY = """
+query($cursor: String) {
+  viewer {
+    repositories(first: 100, after: $cursor, ownerAffiliations: [OWNER, ORGANIZATION_MEMBER, COLLABORATOR], orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        nameWithOwner
+        owner { login __typename }
+        viewerPermission
+        collaborators(first: 100) {
+          pageInfo { hasNextPage }
+          edges { permission node { login name } }
+        }
+      }
+    }
+  }
+}
+"""
+
+
 class GitHubInspector(PlatformInspector):
     """GitHub repository inspector"""
     
-    def __init__(self):
-        super().__init__("GitHub")
+    RATE_LIMIT_HEADERS = ('X-RateLimit-Remaining', 'X-RateLimit-Reset')
+    
+    def __init__(self, max_workers=MAX_WORKERS, cache=None):
+        super().__init__("GitHub", max_workers, cache)
         self.token = os.environ.get('GITHUB_TOKEN')
         
         if not self.token:
             self.errors.append("Missing GITHUB_TOKEN")
             return
+        
+        # Credentials are set once on the session instead of on every request
+        self.session.headers.update({
+            'Authorization': f'token {self.token}',
+            'Accept': 'application/vnd.github.v3+json'
+        })
+    
+    def _create_session(self, cache=None):
+        """Create the HTTP session, revalidating cached GitHub REST responses"""
+        session = super()._create_session(cache)
+        if cache:
+            # GitHub does not count 304 Not Modified against the rate limit, so cached REST
+            # responses (the collaborator fallback) are always revalidated with their ETag
+            # instead of trusted until expiry; the GraphQL repository query is a POST and
+            # is never cached
+            session.settings.always_revalidate = True
+        return session
     
     def inspect(self):
         if self.errors:
             return
         
         try:
-            # Get personal repositories
-            personal_repos = self._get_admin_repos()
-            for repo in personal_repos:
-                users = self._get_repo_collaborators(repo['owner'], repo['name'])
-                self.repositories.append({
-                    'name': repo['full_name'],
-                    'owner': repo['owner'],
-                    'type': 'personal',
-                    'users': users
-                })
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                repos = self._get_admin_repos()
+                # Collaborator lists too long for the GraphQL response come from the REST API
+                missing = [repo for repo in repos if repo['users'] is None]
+                repo_users = executor.map(self._get_repo_collaborators, [r['owner'] for r in missing], [r['name'] for r in missing])
+                for repo, users in zip(missing, repo_users):
+                    repo['users'] = users
             
-            # Get organization repositories
-            orgs = self._get_user_organizations()
-            for org in orgs:
-                org_repos = self._get_org_admin_repos(org)
-                for repo in org_repos:
-                    users = self._get_repo_collaborators(repo['owner'], repo['name'])
+            for repo in repos:
+                if repo['owner_type'] == 'Organization':
                     self.repositories.append({
                         'name': repo['full_name'],
                         'owner': repo['owner'],
                         'type': 'organization',
-                        'organization': org,
-                        'users': users
+                        'organization': repo['owner'],
+                        'users': repo['users']
+                    })
+                else:
+                    self.repositories.append({
+                        'name': repo['full_name'],
+                        'owner': repo['owner'],
+                        'type': 'personal',
+                        'users': repo['users']
                     })
         except Exception as e:
             self.errors.append(f"Error during inspection: {str(e)}")
     
-    def _get_user_organizations(self):
-        url = 'https://api.github.com/user/orgs'
-        headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-        orgs = []
-        
-        while url:
-            res = requests.get(url, headers=headers)
-            if res.status_code != 200:
-                raise Exception(f"Error fetching organizations: {res.status_code}")
-            
-            data = res.json()
-            orgs.extend([org['login'] for org in data])
-            
-            if 'next' in res.links:
-                url = res.links['next']['url']
-            else:
-                url = None
-        
-        return orgs
-    
     def _get_admin_repos(self):
-        url = 'https://api.github.com/user/repos'
-        headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-        params = {'type': 'all', 'sort': 'updated', 'per_page': 100}
+        """Fetch personal and organization repositories with admin access, with their collaborators"""
+        url = 'https://api.github.com/graphql'
+        variables = {'cursor': None}
         repos = []
         
-        while url:
-            res = requests.get(url, headers=headers, params=params)
+        while True:
+            res = self._request('POST', url, json={'query': GITHUB_REPOS_QUERY, 'variables': variables})
             if res.status_code != 200:
                 raise Exception(f"Error fetching repos: {res.status_code}")
             
-            data = res.json()
-            for repo in data:
-                if repo.get('permissions', {}).get('admin', False):
-                    repos.append({
-                        'name': repo['name'],
-                        'full_name': repo['full_name'],
-                        'owner': repo['owner']['login']
-                    })
+            data = parse_json(res)
+            viewer = (data.get('data') or {}).get('viewer')
+            if not viewer:
+                raise Exception(f"Error fetching repos: {data.get('errors')}")
             
-            if 'next' in res.links:
-                url = res.links['next']['url']
-            else:
-                url = None
-        
-        return repos
-    
-    def _get_org_admin_repos(self, org):
-        url = f'https://api.github.com/orgs/{org}/repos'
-        headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-        params = {'type': 'all', 'per_page': 100}
-        repos = []
-        
-        while url:
-            res = requests.get(url, headers=headers, params=params)
-            if res.status_code != 200:
-                raise Exception(f"Error fetching org repos: {res.status_code}")
-            
-            data = res.json()
-            for repo in data:
-                if repo.get('permissions', {}).get('admin', False):
-                    repos.append({
-                        'name': repo['name'],
-                        'full_name': repo['full_name'],
-                        'owner': repo['owner']['login']
-                    })
+            for repo in viewer['repositories']['nodes']:
+                if repo['viewerPermission'] != 'ADMIN':
+                    continue
+                
+                collaborators = repo.get('collaborators')
+                if collaborators is None or collaborators['pageInfo']['hasNextPage']:
+                    # Filled in from the paginated REST endpoint by inspect()
+                    users = None
+                else:
+                    users = []
+                    for edge in collaborators['edges']:
+                        user = edge['node']
+                        users.append({
+                            'username': user['login'],
+                            'display_name': user.get('name') or user['login'],
+                            'permission': edge['permission'].lower()
+                        })
+                
+                repos.append({
+                    'name': repo['name'],
+                    'full_name': repo['nameWithOwner'],
+                    'owner': repo['owner']['login'],
+                    'owner_type': repo['owner']['__typename'],
+                    'users': users
+                })
             
-            if 'next' in res.links:
-                url = res.links['next']['url']
-            else:
-                url = None
+            # GraphQL uses cursors for pagination
+            page_info = viewer['repositories']['pageInfo']
+            if not page_info['hasNextPage']:
+                break
+            variables['cursor'] = page_info['endCursor']
         
         return repos
     
     def _get_repo_collaborators(self, owner, repo_name):
         url = f'https://api.github.com/repos/{owner}/{repo_name}/collaborators'
-        headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
         params = {'per_page': 100}
         users = []
         
         while url:
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 break
             
-            data = res.json()
+            data = parse_json(res)
             for user in data:
                 users.append({
                     'username': user['login'],
@@ -316,62 +445,74 @@ class GitHubInspector(PlatformInspector):
 class GitLabInspector(PlatformInspector):
     """GitLab repository inspector"""
     
-    def __init__(self):
-        super().__init__("GitLab")
+    RATE_LIMIT_HEADERS = ('RateLimit-Remaining', 'RateLimit-Reset')
+    
+    def __init__(self, max_workers=MAX_WORKERS, cache=None):
+        super().__init__("GitLab", max_workers, cache)
         self.token = os.environ.get('GITLAB_TOKEN')
         self.url = os.environ.get('GITLAB_URL', 'https://gitlab.com')
         
         if not self.token:
             self.errors.append("Missing GITLAB_TOKEN")
             return
+        
+        # Credentials are set once on the session instead of on every request
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json'
+        })
     
     def inspect(self):
         if self.errors:
             return
         
         try:
-            # Get personal projects
-            personal_projects = self._get_user_projects()
-            for project in personal_projects:
-                users = self._get_project_members(project['id'])
-                self.repositories.append({
-                    'name': project['full_path'],
-                    'id': project['id'],
-                    'type': 'personal',
-                    'users': users
-                })
-            
-            # Get group projects
-            groups = self._get_user_groups()
-            for group in groups:
-                group_projects = self._get_group_projects(group['id'])
-                for project in group_projects:
-                    users = self._get_project_members(project['id'])
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # Group listings come first: the personal listing also returns projects where
+                # access is inherited from a group, and those are reported under their group
+                groups = self._get_user_groups()
+                group_project_lists = list(executor.map(self._get_group_projects, [g['id'] for g in groups]))
+                group_project_ids = {p['id'] for group_projects in group_project_lists for p in group_projects}
+                
+                # Get personal projects
+                personal_projects = [p for p in self._get_user_projects() if p['id'] not in group_project_ids]
+                project_members = executor.map(self._get_project_members, [p['id'] for p in personal_projects])
+                for project, users in zip(personal_projects, project_members):
                     self.repositories.append({
                         'name': project['full_path'],
                         'id': project['id'],
-                        'type': 'group',
-                        'group': group['name'],
+                        'type': 'personal',
                         'users': users
                     })
+                
+                # Get group projects; a project reached through more than one group is reported once
+                seen = set()
+                for group, group_projects in zip(groups, group_project_lists):
+                    group_projects = [p for p in group_projects if p['id'] not in seen]
+                    seen.update(p['id'] for p in group_projects)
+                    project_members = executor.map(self._get_project_members, [p['id'] for p in group_projects])
+                    for project, users in zip(group_projects, project_members):
+                        self.repositories.append({
+                            'name': project['full_path'],
+                            'id': project['id'],
+                            'type': 'group',
+                            'group': group['name'],
+                            'users': users
+                        })
         except Exception as e:
             self.errors.append(f"Error during inspection: {str(e)}")
     
     def _get_user_groups(self):
         url = f'{self.url}/api/v4/groups'
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
         params = {'per_page': 100}
         groups = []
         
         while url:
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 raise Exception(f"Error fetching groups: {res.status_code}")
             
-            data = res.json()
+            data = parse_json(res)
             for group in data:
                 groups.append({
                     'id': group['id'],
@@ -388,26 +529,22 @@ class GitLabInspector(PlatformInspector):
     
     def _get_user_projects(self):
         url = f'{self.url}/api/v4/projects'
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        params = {'membership': True, 'per_page': 100}
+        # GitLab filters to Maintainer (40) or above; simple=True drops the fields we don't read
+        params = {'membership': True, 'min_access_level': 40, 'simple': True, 'per_page': 100}
         projects = []
         
         while url:
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 raise Exception(f"Error fetching projects: {res.status_code}")
             
-            data = res.json()
+            data = parse_json(res)
             for project in data:
-                if project.get('permissions', {}).get('project_access', {}).get('access_level', 0) >= 40:
-                    projects.append({
-                        'id': project['id'],
-                        'name': project['name'],
-                        'full_path': project['path_with_namespace']
-                    })
+                projects.append({
+                    'id': project['id'],
+                    'name': project['name'],
+                    'full_path': project['path_with_namespace']
+                })
             
             if 'next' in res.links:
                 url = res.links['next']['url']
@@ -418,26 +555,21 @@ class GitLabInspector(PlatformInspector):
     
     def _get_group_projects(self, group_id):
         url = f'{self.url}/api/v4/groups/{group_id}/projects'
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        params = {'per_page': 100}
+        params = {'min_access_level': 40, 'simple': True, 'per_page': 100}
         projects = []
         
         while url:
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 raise Exception(f"Error fetching group projects: {res.status_code}")
             
-            data = res.json()
+            data = parse_json(res)
             for project in data:
-                if project.get('permissions', {}).get('project_access', {}).get('access_level', 0) >= 40:
-                    projects.append({
-                        'id': project['id'],
-                        'name': project['name'],
-                        'full_path': project['path_with_namespace']
-                    })
+                projects.append({
+                    'id': project['id'],
+                    'name': project['name'],
+                    'full_path': project['path_with_namespace']
+                })
             
             if 'next' in res.links:
                 url = res.links['next']['url']
@@ -448,38 +580,20 @@ class GitLabInspector(PlatformInspector):
     
     def _get_project_members(self, project_id):
         url = f'{self.url}/api/v4/projects/{project_id}/members'
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
         params = {'per_page': 100}
         users = []
         
         while url:
-            res = requests.get(url, headers=headers, params=params)
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 break
             
-            data = res.json()
+            data = parse_json(res)
             for user in data:
-                access_level = user.get('access_level', 0)
-                if access_level == 50:
-                    permission = 'owner'
-                elif access_level == 40:
-                    permission = 'maintainer'
-                elif access_level == 30:
-                    permission = 'developer'
-                elif access_level == 20:
-                    permission = 'reporter'
-                elif access_level == 10:
-                    permission = 'guest'
-                else:
-                    permission = 'unknown'
-                
                 users.append({
                     'username': user['username'],
                     'display_name': user.get('name', user['username']),
-                    'permission': permission
+                    'permission': GITLAB_ACCESS_LEVELS.get(user.get('access_level', 0), 'unknown')
                 })
             
             if 'next' in res.links:
@@ -493,78 +607,80 @@ class GitLabInspector(PlatformInspector):
 class AzureDevOpsInspector(PlatformInspector):
     """Azure DevOps repository inspector"""
     
-    def __init__(self):
-        super().__init__("Azure DevOps")
+    def __init__(self, max_workers=MAX_WORKERS, cache=None):
+        super().__init__("Azure DevOps", max_workers, cache)
         self.pat = os.environ.get('AZURE_DEVOPS_PAT')
         self.org = os.environ.get('AZURE_DEVOPS_ORG')
         
         if not self.pat or not self.org:
             self.errors.append("Missing AZURE_DEVOPS_PAT or AZURE_DEVOPS_ORG")
             return
+        
+        # The PAT is encoded once and sent with every request of the session
+        credentials = f':{self.pat}'
+        encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+        self.session.headers.update({
+            'Authorization': f'Basic {encoded_credentials}',
+            'Content-Type': 'application/json'
+        })
     
     def inspect(self):
         if self.errors:
             return
         
         try:
-            projects = self._get_projects()
-            for project in projects:
-                repos = self._get_repositories(project['id'])
-                for repo in repos:
-                    if self._check_user_permissions(project['id'], repo['id']):
-                        users = self._get_repository_permissions(repo['id'])
-                        self.repositories.append({
-                            'name': f"{project['name']}/{repo['name']}",
-                            'project': project['name'],
-                            'repository': repo['name'],
-                            'users': users
-                        })
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                projects = self._get_projects()
+                project_repos = executor.map(self._get_repositories, [p['id'] for p in projects])
+                repos = [(project, repo) for project, repo_list in zip(projects, project_repos) for repo in repo_list]
+                # Permissions for the repositories of all projects are looked up in one batch
+                repo_permissions = executor.map(self._get_repository_permissions, [r['id'] for _, r in repos])
+                for (project, repo), (is_admin, users) in zip(repos, repo_permissions):
+                    if not is_admin:
+                        continue
+                    self.repositories.append({
+                        'name': f"{project['name']}/{repo['name']}",
+                        'project': project['name'],
+                        'repository': repo['name'],
+                        'users': users
+                    })
         except Exception as e:
             self.errors.append(f"Error during inspection: {str(e)}")
     
-    def _get_authentication_header(self):
-        credentials = f':{self.pat}'
-        encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-        return {
-            'Authorization': f'Basic {encoded_credentials}',
-            'Content-Type': 'application/json'
-        }
-    
     def _get_projects(self):
         url = f'https://dev.azure.com/{self.org}/_apis/projects'
-        headers = self._get_authentication_header()
         params = {'api-version': '6.0', '$top': 100}
         projects = []
         
-        while url:
-            res = requests.get(url, headers=headers, params=params)
+        while True:
+            res = self._request('GET', url, params=params)
             if res.status_code != 200:
                 raise Exception(f"Error fetching projects: {res.status_code}")
             
-            data = res.json()
+            data = parse_json(res)
             for project in data.get('value', []):
                 projects.append({
                     'id': project['id'],
                     'name': project['name']
                 })
             
-            if 'continuationToken' in data:
-                params['continuationToken'] = data['continuationToken']
-            else:
-                url = None
+            # Azure DevOps returns the continuation token in a response header
+            continuation_token = res.headers.get('x-ms-continuationtoken')
+            if not continuation_token:
+                break
+            params['continuationToken'] = continuation_token
         
         return projects
     
     def _get_repositories(self, project_id):
         url = f'https://dev.azure.com/{self.org}/{project_id}/_apis/git/repositories'
-        headers = self._get_authentication_header()
         params = {'api-version': '6.0'}
         
-        res = requests.get(url, headers=headers, params=params)
+        res = self._request('GET', url, params=params)
         if res.status_code != 200:
             raise Exception(f"Error fetching repositories: {res.status_code}")
         
-        data = res.json()
+        data = parse_json(res)
         repos = []
         for repo in data.get('value', []):
             repos.append({
@@ -574,35 +690,23 @@ class AzureDevOpsInspector(PlatformInspector):
         
         return repos
     
-    def _check_user_permissions(self, project_id, repo_id):
-        url = f'https://dev.azure.com/{self.org}/_apis/git/repositories/{repo_id}/permissions'
-        headers = self._get_authentication_header()
-        params = {'api-version': '6.0'}
-        
-        res = requests.get(url, headers=headers, params=params)
-        if res.status_code != 200:
-            return False
-        
-        data = res.json()
-        for permission in data.get('value', []):
-            if permission.get('identityType') == 'user' and permission.get('permission') in ['Administer', 'Manage']:
-                return True
-        
-        return False
-    
     def _get_repository_permissions(self, repo_id):
+        """Return whether the user can administer the repository, and its users"""
         url = f'https://dev.azure.com/{self.org}/_apis/git/repositories/{repo_id}/permissions'
-        headers = self._get_authentication_header()
         params = {'api-version': '6.0'}
+        is_admin = False
         users = []
         
-        res = requests.get(url, headers=headers, params=params)
+        # A single permissions payload answers both the admin check and the user listing
+        res = self._request('GET', url, params=params)
         if res.status_code != 200:
-            return users
+            return is_admin, users
         
-        data = res.json()
+        data = parse_json(res)
         for permission in data.get('value', []):
             if permission.get('identityType') == 'user':
+                if permission.get('permission') in ['Administer', 'Manage']:
+                    is_admin = True
                 identity = permission.get('identity', {})
                 users.append({
                     'username': identity.get('displayName', identity.get('uniqueName', 'Unknown')),
@@ -610,45 +714,67 @@ class AzureDevOpsInspector(PlatformInspector):
                     'permission': permission.get('permission', 'unknown')
                 })
         
-        return users
+        return is_admin, users
+
+
+CSV_FIELDNAMES = ['platform', 'repository', 'username', 'display_name', 'permission']
+
+
+def csv_rows(data):
+    """Build the CSV rows for all platforms' repositories"""
+    for platform_data in data:
+        platform = platform_data['platform']
+        for repo in platform_data['repositories']:
+            if repo.get('users'):
+                for user in repo['users']:
+                    yield (
+                        platform,
+                        repo['name'],
+                        user['username'],
+                        user['display_name'],
+                        user['permission']
+                    )
+            else:
+                # Empty row for repositories with no users
+                yield (
+                    platform,
+                    repo['name'],
+                    '',
+                    '',
+                    ''
+                )
 
 
 def export_to_csv(data, filename):
     """Export data to CSV format"""
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['platform', 'repository', 'username', 'display_name', 'permission']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for platform_data in data:
-            platform = platform_data['platform']
-            for repo in platform_data['repositories']:
-                if repo.get('users'):
-                    for user in repo['users']:
-                        writer.writerow({
-                            'platform': platform,
-                            'repository': repo['name'],
-                            'username': user['username'],
-                            'display_name': user['display_name'],
-                            'permission': user['permission']
-                        })
-                else:
-                    # Write empty row for repositories with no users
-                    writer.writerow({
-                        'platform': platform,
-                        'repository': repo['name'],
-                        'username': '',
-                        'display_name': '',
-                        'permission': ''
-                    })
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_FIELDNAMES)
+        writer.writerows(csv_rows(data))
     
     print(f"Data exported to {filename}")
 
 
 def export_to_json(data, filename):
-    """Export data to JSON format"""
+    """Export data to JSON format, writing one repository at a time"""
+    # The output matches json.dump(data, indent=2) of the whole list, with or without orjson;
+    # JSON escapes newlines inside strings, so every newline in the text is structural
     with open(filename, 'w', encoding='utf-8') as jsonfile:
-        json.dump(data, jsonfile, indent=2, ensure_ascii=False)
+        jsonfile.write('[')
+        for i, platform_data in enumerate(data):
+            # Everything but the repositories is serialized up front and split around them
+            outline = dump_json(dict(platform_data, repositories=[]))
+            head, _, tail = ('  ' + outline.replace('\n', '\n  ')).partition('"repositories": []')
+            jsonfile.write(',\n' if i else '\n')
+            jsonfile.write(head + '"repositories": [')
+            
+            repositories = platform_data['repositories']
+            for j, repo in enumerate(repositories):
+                jsonfile.write(',\n' if j else '\n')
+                jsonfile.write('      ' + dump_json(repo).replace('\n', '\n      '))
+            jsonfile.write('\n    ]' if repositories else ']')
+            jsonfile.write(tail)
+        jsonfile.write('\n]' if data else ']')
     
     print(f"Data exported to {filename}")
 
@@ -659,6 +785,8 @@ def main():
     parser.add_argument('--csv', help='Export results to CSV file')
     parser.add_argument('--json', help='Export results to JSON file')
     parser.add_argument('--quiet', action='store_true', help='Suppress console output')
+    parser.add_argument('--cache', action='store_true', help=f'Cache API responses on disk for up to {CACHE_EXPIRE_AFTER // 60} minutes to speed up re-runs')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Number of concurrent API requests per platform (default: {MAX_WORKERS})')
     
     args = parser.parse_args()
     
@@ -668,12 +796,17 @@ def main():
         print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print()
     
+    # Each platform gets its own SQLite cache; requests-cache keeps a session's settings
+    # on its backend, so a backend shared between sessions would mix their settings
+    def cache(platform):
+        return requests_cache.SQLiteCache(f'multi_platform_{platform}_cache') if args.cache else None
+    
     # Initialize inspectors for all platforms
     inspectors = [
-        BitbucketInspector(),
-        GitHubInspector(),
-        GitLabInspector(),
-        AzureDevOpsInspector()
+        BitbucketInspector(args.workers, cache('bitbucket')),
+        GitHubInspector(args.workers, cache('github')),
+        GitLabInspector(args.workers, cache('gitlab')),
+        AzureDevOpsInspector(args.workers, cache('azure_devops'))
     ]
     
     # Run inspections for platforms with valid credentials
@@ -695,22 +828,28 @@ def main():
     
     # Run inspections
     total_repositories = 0
-    export_data = []
     
-    for inspector in valid_inspectors:
-        if not args.quiet:
+    if not args.quiet:
+        for inspector in valid_inspectors:
             print(f"Inspecting {inspector.name}...")
-        
-        inspector.inspect()
-        
-        if not args.quiet:
-            inspector.print_results()
-            if inspector.errors:
-                print(f"Errors: {', '.join(inspector.errors)}")
-            print()
-        
-        total_repositories += len(inspector.repositories)
-        export_data.append(inspector.get_export_data())
+    
+    # Platforms are served by different hosts, so they are inspected at the same time;
+    # each platform's results are printed as soon as its inspection finishes
+    with ThreadPoolExecutor(max_workers=len(valid_inspectors)) as executor:
+        inspections = {executor.submit(inspector.inspect): inspector for inspector in valid_inspectors}
+        for inspection in as_completed(inspections):
+            inspection.result()
+            inspector = inspections[inspection]
+            if not args.quiet:
+                inspector.print_results()
+                if inspector.errors:
+                    print(f"Errors: {', '.join(inspector.errors)}")
+                print()
+            
+            total_repositories += len(inspector.repositories)
+    
+    # Exports keep the fixed platform order
+    export_data = [inspector.get_export_data() for inspector in valid_inspectors]
     
     # Summary
     if not args.quiet: